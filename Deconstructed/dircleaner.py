@@ -4,36 +4,89 @@
 #move to the dir you want to clean, or set in command - python dircleaner.py /path/to/1935
 
 from pathlib import Path
+import os
 import shutil
 import sys
+from collections import defaultdict
 
 def find_items_to_delete(base_dir):
-    """Find all files and folders to delete in month directories."""
+    """Find all files and folders to delete in month directories.
+    
+    Returns a list of (path, is_dir) tuples; is_dir comes from the scandir
+    entry so callers never need to stat the item again.
+    """
     to_delete = []
     
-    for year_dir in Path(base_dir).iterdir():
-        if not year_dir.is_dir() or year_dir.name.startswith('.'):
-            continue
-            
-        for month_dir in sorted(year_dir.iterdir()):
-            if not month_dir.is_dir() or month_dir.name.startswith('.'):
-                continue
-            
+    # os.scandir caches each entry's type from readdir, so no extra stat per item
+    with os.scandir(base_dir) as years:
+        year_dirs = [e for e in years
+                     if e.is_dir(follow_symlinks=False) and not e.name.startswith('.')]
+    
+    for year_dir in year_dirs:
+        with os.scandir(year_dir.path) as months:
+            month_dirs = sorted(
+                (e for e in months
+                 if e.is_dir(follow_symlinks=False) and not e.name.startswith('.')),
+                key=lambda e: e.name,
+            )
+        
+        for month_dir in month_dirs:
             # Look at everything in the month directory
-            for item in month_dir.iterdir():
-                # Skip .zip files
-                if item.is_file() and item.suffix == '.zip':
-                    continue
-                
-                # Skip SimpleArchiveFormat directory
-                if item.is_dir() and item.name == 'SimpleArchiveFormat':
-                    continue
-                
-                # Everything else should be deleted
-                to_delete.append(item)
+            with os.scandir(month_dir.path) as items:
+                for item in items:
+                    # Skip .zip files
+                    if item.name.endswith('.zip') and item.is_file():
+                        continue
+                    
+                    # Skip SimpleArchiveFormat directory
+                    if item.name == 'SimpleArchiveFormat' and item.is_dir():
+                        continue
+                    
+                    # Everything else should be deleted
+                    to_delete.append((item.path, item.is_dir(follow_symlinks=False)))
     
     return to_delete
 
+def delete_items(items, on_error=print):
+    """Delete (path, is_dir) items, grouped by parent directory.
+    
+    Each parent is opened once and files are unlinked relative to its
+    descriptor (unlinkat), so the kernel doesn't resolve the full path
+    for every file. Returns the number of items deleted.
+    """
+    by_parent = defaultdict(list)
+    for path, is_dir in items:
+        by_parent[os.path.dirname(path)].append((path, is_dir))
+    
+    use_dir_fd = os.unlink in os.supports_dir_fd
+    deleted_count = 0
+    
+    for parent, group in by_parent.items():
+        dir_fd = None
+        if use_dir_fd:
+            try:
+                dir_fd = os.open(parent, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except OSError:
+                dir_fd = None
+        try:
+            for path, is_dir in group:
+                try:
+                    if is_dir:
+                        # rmtree already walks with fd-relative calls where supported
+                        shutil.rmtree(path)
+                    elif dir_fd is not None:
+                        os.unlink(os.path.basename(path), dir_fd=dir_fd)
+                    else:
+                        os.unlink(path)
+                    deleted_count += 1
+                except Exception as e:
+                    on_error(path, e)
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+    
+    return deleted_count
+
 def main():
     import argparse
     
@@ -62,8 +115,8 @@ def main():
     # Show what will be deleted
     print(f"Found {len(to_delete)} items to delete:\n")
     
-    files_count = sum(1 for item in to_delete if item.is_file())
-    dirs_count = sum(1 for item in to_delete if item.is_dir())
+    dirs_count = sum(1 for _, is_dir in to_delete if is_dir)
+    files_count = len(to_delete) - dirs_count
     
     print(f"  📄 Files: {files_count}")
     print(f"  📁 Directories: {dirs_count}")
@@ -71,9 +124,9 @@ def main():
     
     # Show first 20 items as examples
     print("Examples of items to delete:")
-    for item in to_delete[:20]:
-        item_type = "📁" if item.is_dir() else "📄"
-        print(f"  {item_type} {item.relative_to(base_dir)}")
+    for path, is_dir in to_delete[:20]:
+        item_type = "📁" if is_dir else "📄"
+        print(f"  {item_type} {os.path.relpath(path, base_dir)}")
     
     if len(to_delete) > 20:
         print(f"  ... and {len(to_delete) - 20} more items")
@@ -89,19 +142,14 @@ def main():
     
     # Delete items
     print("\nDeleting items...")
-    deleted_count = 0
     error_count = 0
     
-    for item in to_delete:
-        try:
-            if item.is_file():
-                item.unlink()
-            elif item.is_dir():
-                shutil.rmtree(item)
-            deleted_count += 1
-        except Exception as e:
-            print(f"❌ Error deleting {item}: {e}")
-            error_count += 1
+    def report_error(item, e):
+        nonlocal error_count
+        print(f"❌ Error deleting {item}: {e}")
+        error_count += 1
+    
+    deleted_count = delete_items(to_delete, on_error=report_error)
     
     print(f"\n✅ Deleted {deleted_count} items")
     if error_count > 0:
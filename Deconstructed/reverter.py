@@ -6,11 +6,46 @@
 #usage: "python re-inverter.py 1935 --recursive"
 
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import os
 import sys
+import tempfile
 
-def invert_pdf(input_path, output_path=None, overwrite=True):
-    """Invert colors in a PDF file."""
+def invert_pages(doc, new_doc, page_numbers):
+    """Append inverted renderings of the given pages of doc to new_doc."""
+    for page_number in page_numbers:
+        page = doc[page_number]
+        
+        # Get the page as an opaque pixmap (no alpha channel to invert or store)
+        pix = page.get_pixmap(alpha=False)
+        
+        # Invert colors in place
+        pix.invert_irect(pix.irect)
+        
+        # Create a new page with the same dimensions
+        rect = page.rect
+        new_page = new_doc.new_page(width=rect.width, height=rect.height)
+        
+        # Insert the inverted image, then release the raster before the next page
+        new_page.insert_image(new_page.rect, pixmap=pix)
+        del pix
+
+def _invert_shard(input_path, start, stop, shard_path):
+    """Worker: invert pages [start, stop) of input_path into shard_path."""
+    doc = fitz.open(input_path)
+    new_doc = fitz.open()
+    invert_pages(doc, new_doc, range(start, stop))
+    new_doc.save(shard_path)
+    new_doc.close()
+    doc.close()
+
+def invert_pdf(input_path, output_path=None, overwrite=True, page_workers=1):
+    """Invert colors in a PDF file.
+    
+    With page_workers > 1, long documents are split into contiguous page
+    ranges rendered by separate processes and merged back in order.
+    """
     if output_path is None:
         if overwrite:
             output_path = input_path
@@ -21,23 +56,36 @@ def invert_pdf(input_path, output_path=None, overwrite=True):
     try:
         doc = fitz.open(input_path)
         new_doc = fitz.open()  # Create new empty PDF
+        page_count = doc.page_count
         
-        for page in doc:
-            # Get the page as a pixmap (image)
-            pix = page.get_pixmap()
-            
-            # Invert colors
-            pix.invert_irect(pix.irect)
-            
-            # Create a new page with the same dimensions
-            new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
-            
-            # Insert the inverted image
-            new_page.insert_image(new_page.rect, pixmap=pix)
+        if page_workers > 1 and page_count > 2 * page_workers:
+            # Each worker opens its own copy of the source; shards are merged in page order
+            step = -(-page_count // page_workers)  # ceiling division
+            with tempfile.TemporaryDirectory() as tmp_dir, \
+                    ProcessPoolExecutor(max_workers=page_workers) as ex:
+                shards = []
+                for start in range(0, page_count, step):
+                    shard_path = os.path.join(tmp_dir, f"{start:06d}.pdf")
+                    stop = min(start + step, page_count)
+                    shards.append((shard_path, ex.submit(_invert_shard, input_path, start, stop, shard_path)))
+                for shard_path, future in shards:
+                    future.result()
+                    with fitz.open(shard_path) as shard:
+                        new_doc.insert_pdf(shard)
+        else:
+            invert_pages(doc, new_doc, range(page_count))
         
-        new_doc.save(output_path)
-        new_doc.close()
-        doc.close()
+        # Write beside the target and swap it in atomically, so the source is never
+        # overwritten while still open and the compacting save options are safe
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        try:
+            new_doc.save(tmp_path, garbage=4, deflate=True, clean=True)
+            new_doc.close()
+            doc.close()
+            os.replace(tmp_path, output_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
 
         return True, f'{input_path.name} → {output_path.name}'
 
@@ -53,6 +101,9 @@ def main():
                        help='Create new _inverted files instead of overwriting (default: overwrite)')
     parser.add_argument('--recursive', '-r', action='store_true',
                        help='Process directories recursively')
+    parser.add_argument('--workers', '-w', type=int, default=min(os.cpu_count() or 1, 4),
+                       help='Worker processes, one PDF each; with fewer PDFs than workers, '
+                            'pages of each PDF are split across them (default: min(CPU count, 4))')
     
     args = parser.parse_args()
     
@@ -91,12 +142,24 @@ def main():
             print("Cancelled")
             sys.exit(0)
     
+    workers = max(1, args.workers)
     success_count = 0
-    for pdf_file in pdf_files:
-        ok, msg = invert_pdf(pdf_file, overwrite=overwrite)
-        print(f"{'✅' if ok else '❌'} {msg}")
-        if ok:
-            success_count += 1
+    if len(pdf_files) < workers:
+        # Too few files to keep every core busy - split each file's pages instead
+        for pdf_file in pdf_files:
+            ok, msg = invert_pdf(pdf_file, overwrite=overwrite, page_workers=workers)
+            print(f"{'✅' if ok else '❌'} {msg}")
+            if ok:
+                success_count += 1
+    else:
+        # Each PDF is rasterized independently, so spread them across processes
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(invert_pdf, pdf_file, None, overwrite) for pdf_file in pdf_files]
+            for future in as_completed(futures):
+                ok, msg = future.result()
+                print(f"{'✅' if ok else '❌'} {msg}")
+                if ok:
+                    success_count += 1
     
     print(f"\n✅ Successfully inverted {success_count}/{len(pdf_files)} files")
 
@@ -23,8 +23,34 @@ import sys
 import shutil
 import zipfile
 import argparse
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from xml.etree.ElementTree import Element, SubElement, ElementTree, indent
+from xml.sax.saxutils import escape
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Metadata files worth deflating; the SAF 'contents' file has no suffix
+TEXT_SUFFIXES = {".xml", ".txt", ""}
+
+# --compress mode -> (compression for metadata, compression for digital objects)
+ZIP_MODES = {
+    "store":   ((zipfile.ZIP_STORED, None), (zipfile.ZIP_STORED, None)),
+    "fast":    ((zipfile.ZIP_DEFLATED, 1), (zipfile.ZIP_STORED, None)),
+    "default": ((zipfile.ZIP_DEFLATED, None), (zipfile.ZIP_DEFLATED, None)),
+}
+
+# Match ElementTree's attribute escaping so whitespace survives a round-trip
+_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+
+_LANG_RE = re.compile(r'\[([^\]]+)\]')
+
+FICLONE = 0x40049409  # Linux ioctl: share extents copy-on-write (btrfs, XFS)
 
 
 def parse_args():
@@ -37,6 +63,19 @@ def parse_args():
         default="SimpleArchiveFormat",
         help="Output directory name (default: SimpleArchiveFormat)"
     )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=None,
+        help="Number of items to build in parallel (default: chosen by Python)"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=sorted(ZIP_MODES),
+        default="fast",
+        help="Zip compression: 'store' (none), 'fast' (deflate metadata only, "
+             "store digital objects), 'default' (deflate everything) (default: fast)"
+    )
     return parser.parse_args()
 
 
@@ -57,7 +96,7 @@ def parse_dc_field(header):
 
     # Extract language qualifier e.g. [en]
     language = None
-    lang_match = re.search(r'\[([^\]]+)\]', header)
+    lang_match = _LANG_RE.search(header)
     if lang_match:
         language = lang_match.group(1)
         header = header[:lang_match.start()]
@@ -71,25 +110,54 @@ def parse_dc_field(header):
     return {"element": element, "qualifier": qualifier, "language": language}
 
 
-def build_dublin_core_xml(metadata_fields):
+def write_dublin_core_xml(path, metadata_fields):
     """
-    Build a dublin_core.xml ElementTree from a list of field dicts.
+    Write dublin_core.xml for a list of field dicts.
     Each dict has keys: element, qualifier, language, value.
-    """
-    root = Element("dublin_core")
-    root.set("schema", "dc")
 
+    The schema is fixed, so the document is assembled as text rather than
+    through an ElementTree.
+    """
+    if not metadata_fields:
+        # Match ElementTree's self-closing form for an item without metadata
+        path.write_bytes(b'<?xml version="1.0" encoding="UTF-8"?>\n<dublin_core schema="dc" />\n')
+        return
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>\n<dublin_core schema="dc">\n']
     for field in metadata_fields:
-        dcvalue = SubElement(root, "dcvalue")
-        dcvalue.set("element", field["element"])
+        attrs = f'element="{escape(field["element"], _ATTR_ENTITIES)}"'
         if field["qualifier"]:
-            dcvalue.set("qualifier", field["qualifier"])
+            attrs += f' qualifier="{escape(field["qualifier"], _ATTR_ENTITIES)}"'
         if field["language"]:
-            dcvalue.set("language", field["language"])
-        dcvalue.text = field["value"]
+            attrs += f' language="{escape(field["language"], _ATTR_ENTITIES)}"'
+        lines.append(f'  <dcvalue {attrs}>{escape(field["value"])}</dcvalue>\n')
+    lines.append('</dublin_core>\n')
+    path.write_bytes("".join(lines).encode("utf-8"))
+
+
+def fast_copy(source, dest):
+    """
+    Place a copy of source at dest as cheaply as the filesystem allows.
 
-    indent(root, space="  ")
-    return ElementTree(root)
+    Tries a hardlink first (no data copied), then a reflink clone, and
+    falls back to shutil.copy2 when neither is supported (e.g. the output
+    is on a different filesystem).
+    """
+    try:
+        os.link(source, dest)
+        return
+    except OSError:
+        pass
+
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(dest, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, dest)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(source, dest)
 
 
 def validate_row(row_num, record, headers, filename_col, files_dir):
@@ -111,7 +179,66 @@ def validate_row(row_num, record, headers, filename_col, files_dir):
     return errors
 
 
-def build_saf(csv_path, output_dir, log=print):
+def build_item(item_dir, record, filename_col, files_dir, dc_columns):
+    """
+    Write one SAF item directory (object, contents, dublin_core.xml).
+
+    dc_columns is a list of (column index, parse_dc_field result) pairs for
+    the CSV's Dublin Core columns. Returns the filename.
+    """
+    item_dir.mkdir()
+
+    filename = record[filename_col].strip()
+    source = files_dir / filename
+
+    # Copy digital object
+    fast_copy(source, item_dir / filename)
+
+    # Write contents file
+    (item_dir / "contents").write_text(filename + "\n", encoding="utf-8")
+
+    # Build metadata fields list
+    metadata_fields = []
+    for col_idx, parsed in dc_columns:
+        value = record[col_idx].strip()
+        if value:
+            metadata_fields.append({**parsed, "value": value})
+
+    # Write dublin_core.xml
+    write_dublin_core_xml(item_dir / "dublin_core.xml", metadata_fields)
+
+    return filename
+
+
+def zip_items(zip_path, arc_root, item_queue, compress="fast", errors=None):
+    """
+    Zip item directories taken from item_queue until a None sentinel arrives.
+
+    Entries are stored under arc_root/item_NNN/. Runs in its own thread so
+    zipping overlaps with building; any exception is appended to errors and
+    the queue is still drained so producers never block.
+    """
+    # PDFs and images are already compressed, so deflating them mostly burns CPU
+    text_mode, object_mode = ZIP_MODES[compress]
+    try:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            while (item_dir := item_queue.get()) is not None:
+                arc_dir = Path(arc_root) / item_dir.name
+                zf.write(item_dir, arc_dir)
+                with os.scandir(item_dir) as entries:
+                    for entry in entries:
+                        suffix = os.path.splitext(entry.name)[1]
+                        compress_type, level = text_mode if suffix in TEXT_SUFFIXES else object_mode
+                        zf.write(entry.path, arc_dir / entry.name,
+                                 compress_type=compress_type, compresslevel=level)
+    except Exception as e:
+        if errors is not None:
+            errors.append(e)
+        while item_queue.get() is not None:
+            pass
+
+
+def build_saf(csv_path, output_dir, log=print, workers=None, compress="fast"):
     csv_path = Path(csv_path).resolve()
     files_dir = csv_path.parent
     output_dir = Path(output_dir)
@@ -120,92 +247,127 @@ def build_saf(csv_path, output_dir, log=print):
     log(f"Files dir : {files_dir}")
     log(f"Output    : {output_dir.resolve()}")
 
-    # --- Read CSV ---
+    # Items are built into a staging directory while the CSV streams past,
+    # so an existing output is only replaced once every row has validated.
+    staging_dir = output_dir.with_name(output_dir.name + ".partial")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    zip_path = output_dir.parent / (output_dir.name + ".zip")
+    staging_zip = zip_path.with_name(zip_path.name + ".partial")
+
     with open(csv_path, newline="", encoding="utf-8-sig") as f:
         reader = csv.reader(f)
         headers = next(reader, None)
         if headers is None:
             raise ValueError("CSV file is empty.")
-        rows = list(reader)
 
-    headers = [h.strip() for h in headers]
+        headers = [h.strip() for h in headers]
 
-    # Find filename column
-    try:
-        filename_col = headers.index("filename")
-    except ValueError:
-        raise ValueError("CSV must have a 'filename' column.")
-
-    # --- Validate all rows up front ---
-    log(f"Validating {len(rows)} rows...")
-    all_errors = []
-    for i, record in enumerate(rows):
-        errors = validate_row(i + 2, record, headers, filename_col, files_dir)
-        all_errors.extend(errors)
+        # Find filename column
+        try:
+            filename_col = headers.index("filename")
+        except ValueError:
+            raise ValueError("CSV must have a 'filename' column.")
 
+        # Parse the Dublin Core headers once rather than per row
+        dc_columns = []
+        for col_idx, header in enumerate(headers):
+            if col_idx == filename_col:
+                continue
+            parsed = parse_dc_field(header)
+            if parsed:
+                dc_columns.append((col_idx, parsed))
+
+        # --- Validate, build and zip as a pipeline ---
+        # This thread reads and validates rows; a thread pool writes the
+        # independent item directories (file I/O, which releases the GIL);
+        # finished items are logged in row order and handed through a
+        # bounded queue to a zipper thread appending to the archive.
+        log("Validating and building items...")
+        staging_dir.mkdir(parents=True)
+        all_errors = []
+        item_count = 0
+        pending = deque()
+        # At most 2x workers items are queued or building, so the reader
+        # can't run ahead of the pool and hold the whole CSV in memory
+        max_workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        max_pending = 2 * max_workers
+        zip_queue = queue.Queue(maxsize=64)
+        zip_errors = []
+        zipper = threading.Thread(
+            target=zip_items,
+            args=(staging_zip, output_dir.name, zip_queue, compress, zip_errors),
+            daemon=True,
+        )
+        zipper.start()
+
+        def log_finished(keep=None):
+            # Log finished items in row order, blocking on the oldest while
+            # more than `keep` are pending
+            while pending and (
+                (keep is not None and len(pending) > keep) or pending[0][1].done()
+            ):
+                item_num, future = pending.popleft()
+                log(f"  ✓ item_{item_num:03d}  {future.result()}")
+                if not all_errors:
+                    zip_queue.put(staging_dir / f"item_{item_num:03d}")
+
+        try:
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                    for item_num, record in enumerate(reader):
+                        errors = validate_row(item_num + 2, record, headers, filename_col, files_dir)
+                        item_count += 1
+                        if errors:
+                            all_errors.extend(errors)
+                            continue
+                        if all_errors:
+                            continue  # keep collecting errors, but stop writing items
+
+                        log_finished(keep=max_pending - 1)
+                        item_dir = staging_dir / f"item_{item_num:03d}"
+                        pending.append((item_num, ex.submit(
+                            build_item, item_dir, record, filename_col, files_dir, dc_columns
+                        )))
+                        log_finished()
+
+                    log_finished(keep=0)
+            finally:
+                zip_queue.put(None)
+                zipper.join()
+        except BaseException:
+            # A failed copy or write must not leave the staging output behind
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            staging_zip.unlink(missing_ok=True)
+            raise
+
+    if all_errors or zip_errors:
+        shutil.rmtree(staging_dir)
+        staging_zip.unlink(missing_ok=True)
+    if zip_errors:
+        raise zip_errors[0]
     if all_errors:
         msg = "Validation failed — fix these issues before building:\n" + \
               "\n".join(f"  ✗ {err}" for err in all_errors)
         raise ValueError(msg)
 
-    log(f"✓ All {len(rows)} rows valid")
+    log(f"✓ All {item_count} rows valid")
 
-    # --- Create output directory ---
+    # --- Move staged items and zip into place ---
     if output_dir.exists():
         log(f"WARNING: Output directory '{output_dir}' already exists. Overwriting.")
         shutil.rmtree(output_dir)
-    output_dir.mkdir(parents=True)
-
-    # --- Build SAF structure ---
-    for item_num, record in enumerate(rows):
-        item_dir = output_dir / f"item_{item_num:03d}"
-        item_dir.mkdir()
+    staging_dir.rename(output_dir)
+    os.replace(staging_zip, zip_path)
 
-        filename = record[filename_col].strip()
-        source = files_dir / filename
-
-        # Copy digital object
-        shutil.copy2(source, item_dir / filename)
-
-        # Write contents file
-        (item_dir / "contents").write_text(filename + "\n", encoding="utf-8")
-
-        # Build metadata fields list
-        metadata_fields = []
-        for col_idx, header in enumerate(headers):
-            if col_idx == filename_col:
-                continue
-            value = record[col_idx].strip()
-            if not value:
-                continue
-            parsed = parse_dc_field(header)
-            if parsed:
-                metadata_fields.append({**parsed, "value": value})
-
-        # Write dublin_core.xml
-        tree = build_dublin_core_xml(metadata_fields)
-        dc_path = item_dir / "dublin_core.xml"
-        with open(dc_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            tree.write(f, encoding="unicode", xml_declaration=False)
-            f.write("\n")
-
-        log(f"  ✓ item_{item_num:03d}  {filename}")
-
-    log(f"✓ Done — {len(rows)} items written to '{output_dir}/'")
-
-    # --- Zip the output directory ---
-    zip_path = output_dir.parent / (output_dir.name + ".zip")
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for file in output_dir.rglob("*"):
-            zf.write(file, file.relative_to(output_dir.parent))
+    log(f"✓ Done — {item_count} items written to '{output_dir}/'")
     log(f"✓ Zipped  → {zip_path.name}")
 
 
 if __name__ == "__main__":
     args = parse_args()
     try:
-        build_saf(args.csv_file, args.output)
+        build_saf(args.csv_file, args.output, workers=args.workers, compress=args.compress)
     except ValueError as e:
         print(f"ERROR: {e}")
         sys.exit(1)
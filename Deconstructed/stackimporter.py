@@ -2,28 +2,64 @@
 stackimporter.py — importable OpenStack Swift uploader.
 
 Main entry point:
-    upload_directory(source_dir, container, env, log=print)
+    upload_directory(source_dir, container, env, log=print, max_parallel=8, ...)
         -> (success_count, total_count)
 """
 
-import subprocess
+import hashlib
+import io
+import json
+import os
+import random
+import tarfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
+from urllib.parse import quote, unquote
+
+from swiftclient.client import store_response
+from swiftclient.exceptions import ClientException
+from swiftclient.service import SwiftError, SwiftService, SwiftUploadObject, get_conn
 
 MAX_RETRIES = 5
+RETRY_BACKOFF_MAX = 30  # seconds
 TIMEOUT = 14400  # 4 hours — large file safety net
-SEGMENT_THRESHOLD = 5 * 1024 * 1024 * 1024      # 5 GB
-SEGMENT_SIZE      = 4 * 1024 * 1024 * 1024 + 500 * 1024 * 1024  # 4.5 GB
-
-
-def _swift(*args, env, timeout=30, check=True):
-    return subprocess.run(
-        ["python3", "-m", "swiftclient.shell"] + list(args),
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-        check=check,
-        env=env,
+# Files above the threshold go up as segments in parallel, joined by a
+# manifest (SLO where the cluster supports it); one PUT is one TCP stream.
+SEGMENT_THRESHOLD = 100 * 1024 * 1024  # 100 MB
+SEGMENT_SIZE      = 64 * 1024 * 1024   # 64 MB, raised for files over MAX_SEGMENTS of these
+MAX_SEGMENTS      = 1000               # Swift's default max_manifest_segments
+SEGMENT_THREADS   = 4  # segment PUTs in flight across the whole batch
+# Directories with many small files send them as one tar that Swift unpacks
+# into individual objects (bulk extract-archive), one request per bundle.
+SMALL_FILE_MAX   = 1024 * 1024        # 1 MB
+BUNDLE_MIN_FILES = 32
+BUNDLE_MAX_BYTES = 16 * 1024 * 1024   # 16 MB, built in memory
+
+# (auth URL, container) pairs already confirmed to exist in this process
+_container_cache: set[tuple[str, str]] = set()
+
+
+def _service(env: dict, **options) -> SwiftService:
+    """
+    Build an in-process SwiftService from OS_* variables.
+
+    A single service keeps one authenticated connection per worker thread,
+    so uploads don't pay interpreter start-up and a Keystone round-trip
+    per call the way `python3 -m swiftclient.shell` did.
+    """
+    opts = {k.lower(): v for k, v in env.items() if k.startswith("OS_") and v}
+    opts["auth_version"] = (
+        env.get("OS_IDENTITY_API_VERSION") or env.get("OS_AUTH_VERSION") or "3"
     )
+    opts.setdefault("timeout", TIMEOUT)
+    opts.update(options)
+    return SwiftService(options=opts)
+
+
+def _error_text(result: dict) -> str:
+    err = str(result.get("error") or "").strip().splitlines()
+    return err[-1] if err else "unknown error"
 
 
 def check_auth(env: dict, log=print) -> tuple[bool, str]:
@@ -33,105 +69,435 @@ def check_auth(env: dict, log=print) -> tuple[bool, str]:
     log(f"Username : {env.get('OS_USERNAME', '(not set)')}")
     log("Requesting token…")
     try:
-        result = _swift("auth", env=env, timeout=30)
-        if "OS_AUTH_TOKEN=" in result.stdout:
-            log("Token received.")
-            return True, "Authenticated successfully."
-        log("No token in response.")
-        return False, "Authentication failed — no token received."
-    except subprocess.TimeoutExpired:
-        return False, "Auth request timed out — check network/URL."
-    except subprocess.CalledProcessError as e:
-        detail = (e.stderr or "").strip().splitlines()
-        msg = detail[-1] if detail else "Unknown error"
-        log(f"Error: {msg}")
-        return False, f"Auth error: {msg}"
-
-
-def _ensure_container(container: str, env: dict, log):
+        with _service(env, timeout=30) as svc:
+            result = svc.stat()
+    except SwiftError as e:
+        log(f"Error: {e.value}")
+        return False, f"Auth error: {e.value}"
+    if result["success"]:
+        log("Token received.")
+        return True, "Authenticated successfully."
+    msg = _error_text(result)
+    log(f"Error: {msg}")
+    return False, f"Auth error: {msg}"
+
+
+def _preauth_options(env: dict) -> dict:
+    """
+    Fetch one token up front and return service options that carry it.
+
+    SwiftService opens a Connection per worker thread, and each would
+    otherwise run its own Keystone round-trip; given os_auth_token and
+    os_storage_url they reuse this token and only re-authenticate on a 401.
+    """
     try:
-        _swift("stat", container, env=env)
+        with _service(env, timeout=30, verbose=2) as svc:
+            result = svc.stat()
+    except SwiftError:
+        return {}
+    # At verbose > 1 the account stat includes the storage URL and token
+    items = dict(result.get("items") or ()) if result["success"] else {}
+    url, token = items.get("StorageURL"), items.get("Auth Token")
+    if url and token:
+        return {"os_storage_url": url, "os_auth_token": token}
+    return {}
+
+
+def _ensure_container(container: str, svc: SwiftService, env: dict, log):
+    key = (env.get("OS_AUTH_URL", ""), container)
+    if key in _container_cache:
         log(f"Container '{container}' exists.")
-    except subprocess.CalledProcessError:
+        return
+    try:
+        result = svc.stat(container=container)
+    except SwiftError as e:
+        # A missing container raises rather than returning success=False;
+        # anything other than a 404 (auth, 5xx) must not trigger a create
+        if not (isinstance(e.exception, ClientException) and e.exception.http_status == 404):
+            raise
         log(f"Container '{container}' not found — creating…")
+        result = svc.post(container=container)
+        if not result["success"]:
+            raise RuntimeError(f"Could not create container '{container}': {_error_text(result)}")
+    else:
+        if not result["success"]:
+            raise RuntimeError(f"Could not check container '{container}': {_error_text(result)}")
+        log(f"Container '{container}' exists.")
+    _container_cache.add(key)
+
+
+def _bulk_target(svc: SwiftService) -> dict | None:
+    """
+    Connection settings for extract-archive PUTs, or None if the cluster
+    lacks bulk upload.
+    """
+    try:
+        caps = svc.capabilities()
+    except (ClientException, SwiftError):
+        return None
+    if not caps["success"] or "bulk_upload" not in caps["capabilities"]:
+        return None
+    # Connections aren't thread-safe, so each worker thread builds its own
+    # from the service's options (token, TLS and retry settings included)
+    return {"options": svc._options, "local": threading.local()}
+
+
+def _bulk_conn(bulk: dict):
+    conn = getattr(bulk["local"], "conn", None)
+    if conn is None:
+        conn = bulk["local"].conn = get_conn(bulk["options"])
+    return conn
+
+
+def _put_extract_archive(url, token, container, contents, http_conn=None,
+                         service_token=None, response_dict=None):
+    """
+    PUT a tar to container with ?extract-archive=tar and return the parsed
+    JSON result. Shaped like swiftclient.client.put_object so it can run
+    under Connection._retry, but keeps the body, which carries the per-member
+    errors that put_object discards.
+    """
+    parsed, conn = http_conn
+    path = f"{parsed.path.rstrip('/')}/{quote(container)}?extract-archive=tar"
+    headers = {"X-Auth-Token": token, "Accept": "application/json"}
+    if service_token:
+        headers["X-Service-Token"] = service_token
+    conn.putrequest(path, headers=headers, data=contents)
+    resp = conn.getresponse()
+    body = resp.read()
+    store_response(resp, response_dict)
+    if resp.status < 200 or resp.status >= 300:
+        raise ClientException.from_response(resp, "Extract archive failed", body)
+    return json.loads(body)
+
+
+def _iter_files(root: str):
+    """
+    Yield (path, size, object_name) for every regular file under root.
+
+    object_name keeps the source folder name and always uses '/':
+        root = /foo/bar/MyData  →  MyData/subdir/file.txt
+    Types come from the cached DirEntry, and the size from the one stat
+    DirEntry.stat() makes; symlinks are not followed.
+    """
+    stack = [(root, os.path.basename(os.path.normpath(root)))]
+    while stack:
+        dir_path, prefix = stack.pop()
         try:
-            _swift("post", container, env=env)
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Could not create container '{container}': {e.stderr.strip()}")
+            it = os.scandir(dir_path)
+        except OSError:
+            continue  # unreadable directories are skipped, as os.walk did
+        with it:
+            for entry in it:
+                name = f"{prefix}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, name))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat(follow_symlinks=False).st_size, name
 
 
 def _upload_file(
-    file_path: Path,
-    source_root: Path,
+    file_path: str,
+    object_name: str,
     container: str,
-    env: dict,
+    svc: SwiftService,
     log,
-    attempt: int = 1,
+    cancel: threading.Event,
+    size: int | None = None,
+    segment_threshold: int = SEGMENT_THRESHOLD,
+    segment_size: int = SEGMENT_SIZE,
+    skip_unchanged: bool = False,
 ) -> bool:
-    # Preserve the source folder name in the object path:
-    #   source_root = /foo/bar/MyData  →  object_name = MyData/subdir/file.txt
-    object_name = str(file_path.relative_to(source_root.parent))
-    size_mb = file_path.stat().st_size / (1024 * 1024)
-
-    cmd = ["upload"]
-    if file_path.stat().st_size > SEGMENT_THRESHOLD:
-        segment_container = f"{container}_segments"
-        cmd += [
-            "--segment-size", str(SEGMENT_SIZE),
-            "--segment-container", segment_container,
-        ]
-    cmd += [container, str(file_path), "--object-name", object_name]
+    # Callers that listed the directory already know the size; stat at most once
+    if size is None:
+        size = os.stat(file_path).st_size
+    size_mb = size / (1024 * 1024)
 
-    try:
-        _swift(*cmd, env=env, timeout=TIMEOUT)
-        log(f"✓  {object_name}  ({size_mb:.1f} MB)")
-        return True
-    except subprocess.TimeoutExpired:
-        log(f"⏰ Timeout: {object_name} (attempt {attempt})")
-    except subprocess.CalledProcessError as e:
-        err = (e.stderr or "").strip().splitlines()
-        log(f"✗  {object_name} — {err[-1] if err else 'unknown error'} (attempt {attempt})")
-
-    if attempt < MAX_RETRIES:
-        log(f"↻  Retrying {object_name} ({attempt + 1}/{MAX_RETRIES})…")
-        return _upload_file(file_path, source_root, container, env, log, attempt + 1)
+    # upload_directory has already ensured the container (and the segments
+    # container before any large file), so don't PUT it again per object
+    options = {"skip_container_put": True}
+    if size > segment_threshold:
+        options["segment_size"] = max(segment_size, -(-size // MAX_SEGMENTS))
+        options["segment_container"] = f"{container}_segments"
+    if skip_unchanged:
+        # swiftclient tries skip_identical (a full MD5 read) before the cheap
+        # size + mtime check, so HEAD once here and only ask for the MD5
+        # compare when the sizes match under a new mtime (a rebuilt file)
+        remote = _remote_headers(svc, container, object_name)
+        if remote is None:
+            options["changed"] = True  # couldn't tell; let the service check
+        elif not remote:
+            options["leave_segments"] = True  # nothing to replace, skip its HEAD
+        else:
+            try:
+                mtime = "%f" % os.path.getmtime(file_path)
+            except OSError:
+                mtime = None
+            same_size = remote.get("content-length") == str(size)
+            if same_size and remote.get("x-object-meta-mtime") == mtime:
+                log(f"=  {object_name}  (unchanged, skipped)")
+                return True
+            options["skip_identical"] = same_size and size <= segment_threshold
+    upload = SwiftUploadObject(file_path, object_name=object_name)
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        if cancel.is_set():
+            log(f"✗  {object_name} — cancelled.")
+            return False
+        error = "no result returned"
+        try:
+            for result in svc.upload(container, [upload], options=options):
+                if result.get("action") != "upload_object":
+                    continue
+                if result["success"]:
+                    if result.get("status") in ("skipped-identical", "skipped-changed"):
+                        log(f"=  {object_name}  (unchanged, skipped)")
+                    else:
+                        log(f"✓  {object_name}  ({size_mb:.1f} MB)")
+                    return True
+                error = _error_text(result)
+        except SwiftError as e:
+            error = str(e.value)
+        log(f"✗  {object_name} — {error} (attempt {attempt})")
+
+        if attempt < MAX_RETRIES:
+            # Exponential backoff with jitter so parallel workers don't retry in lockstep
+            delay = min(2 ** attempt, RETRY_BACKOFF_MAX) + random.random()
+            log(f"↻  Retrying {object_name} in {delay:.0f}s ({attempt + 1}/{MAX_RETRIES})…")
+            cancel.wait(delay)
 
     log(f"✗  Giving up on {object_name} after {MAX_RETRIES} attempts.")
     return False
 
 
+def _remote_headers(svc: SwiftService, container: str, object_name: str) -> dict | None:
+    """Headers of the existing object, {} if there is none, or None if the HEAD failed."""
+    try:
+        for result in svc.stat(container=container, objects=[object_name]):
+            if result["success"]:
+                return result["headers"]
+            err = result.get("error")
+            if isinstance(err, ClientException) and err.http_status == 404:
+                return {}
+    except SwiftError:
+        pass
+    return None
+
+
+def _upload_bundle(
+    files: list,
+    bulk: dict,
+    container: str,
+    svc: SwiftService,
+    log,
+    cancel: threading.Event,
+    skip_unchanged: bool = False,
+) -> int:
+    """
+    Upload small files as one tar that Swift extracts server-side, leaving the
+    same objects _upload_file would. Returns the number of files stored; any
+    the bundle could not store are sent one by one instead.
+    """
+    if cancel.is_set():
+        return 0
+    folder = files[0][2].rpartition("/")[0]
+
+    skipped = 0
+    if skip_unchanged:
+        # One listing of the folder gives every remote MD5, instead of a HEAD per file
+        remote = _remote_hashes(svc, container, folder)
+        if remote:
+            changed = [f for f in files if remote.get(f[2]) != _md5(f[0])]
+            skipped = len(files) - len(changed)
+            if skipped:
+                log(f"=  {folder}/  ({skipped} unchanged files skipped)")
+            files = changed
+            if not files:
+                return skipped
+
+    buf = io.BytesIO()
+    try:
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for path, _, name in files:
+                tar.add(path, arcname=name, recursive=False)
+        buf.seek(0)
+        # The connection re-authenticates on a 401 and retries with backoff;
+        # each attempt rewinds the buffer rather than copying the bundle
+        result = _bulk_conn(bulk)._retry(
+            lambda *a, **kw: buf.seek(0), _put_extract_archive, container, buf
+        )
+    except (OSError, ValueError, ClientException) as e:
+        log(f"✗  {folder}/ bundle of {len(files)} files — {e}; sending individually")
+        retry = files
+    else:
+        # Errors lists [quoted object path, status] for members not stored
+        failed = [unquote(path) for path, _ in result.get("Errors") or ()]
+        retry = [f for f in files if any(p.endswith("/" + f[2]) for p in failed)]
+        status = str(result.get("Response Status", ""))
+        if not failed and not status.startswith("2"):
+            log(f"✗  {folder}/ bundle of {len(files)} files — {status}; sending individually")
+            retry = files
+        elif len(retry) < len(files):
+            size_mb = sum(size for _, size, _ in files) / (1024 * 1024)
+            log(f"✓  {folder}/  ({len(files) - len(retry)} files bundled, {size_mb:.1f} MB)")
+
+    stored = skipped + len(files) - len(retry)
+    for path, size, name in retry:
+        stored += _upload_file(
+            path, name, container, svc, log, cancel, size, skip_unchanged=skip_unchanged
+        )
+    return stored
+
+
+def _md5(path: str) -> str | None:
+    """Hex MD5 of a (small) file, or None if it can't be read."""
+    try:
+        return hashlib.md5(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _remote_hashes(svc: SwiftService, container: str, folder: str) -> dict:
+    """{object name: etag} for objects directly under folder/, or {} on error."""
+    hashes = {}
+    try:
+        for page in svc.list(container=container, options={"prefix": f"{folder}/", "delimiter": "/"}):
+            if not page["success"]:
+                return {}
+            # Sub-folders come back as {"subdir": ...} entries without a name
+            hashes.update((obj["name"], obj.get("hash")) for obj in page["listing"] if "name" in obj)
+    except SwiftError:
+        return {}
+    return hashes
+
+
 def upload_directory(
     source_dir,
     container: str,
     env: dict,
     log=print,
+    max_parallel: int = 8,
+    segment_threshold: int = SEGMENT_THRESHOLD,
+    segment_size: int = SEGMENT_SIZE,
+    segment_threads: int = SEGMENT_THREADS,
+    cancel: threading.Event | None = None,
+    skip_unchanged: bool = True,
 ) -> tuple[int, int]:
     """
     Upload all files under source_dir to container, preserving folder structure.
 
     Args:
-        source_dir: Path (or str) to the local directory to upload.
-        container:  Swift container name.
-        env:        dict of OS_* environment variables (including OS_PASSWORD).
-        log:        callable(str) for progress output.
+        source_dir:   Path (or str) to the local directory to upload.
+        container:    Swift container name.
+        env:          dict of OS_* environment variables (including OS_PASSWORD).
+        log:          callable(str) for progress output.
+        max_parallel: number of files uploaded concurrently.
+        segment_threshold: files larger than this (bytes) are uploaded in segments.
+        segment_size: minimum segment size in bytes.
+        segment_threads: segment uploads in flight, shared by all files.
+        cancel:       optional Event; once set, no new files start, queued ones
+                      are dropped and transfers already in flight finish.
+        skip_unchanged: leave objects that already match the local file alone
+                      (counted as successes).
 
     Returns:
         (success_count, total_count)
     """
     source_dir = Path(source_dir)
+    workers = max(1, max_parallel)
+    if cancel is None:
+        cancel = threading.Event()
+
+    auth = _preauth_options(env)
+
+    with _service(
+        env,
+        object_uu_threads=workers,
+        segment_threads=max(1, segment_threads),
+        **auth,
+    ) as svc:
+        _ensure_container(container, svc, env, log)
+
+        log(f"Uploading files from '{source_dir.name}' → container '{container}'")
+
+        # Each upload blocks on the network, so threads overlap them fine;
+        # serialise log calls so progress lines from workers don't interleave.
+        log_lock = threading.Lock()
+
+        def locked_log(msg):
+            with log_lock:
+                log(msg)
+
+        # Files are submitted as the walk finds them, with at most 2x workers
+        # in flight, so memory stays flat however large the tree is.
+        success = total = 0
+        pending = set()
+        bulk = _bulk_target(svc)
+        small = []  # small files seen so far in the directory being walked
+        small_bytes = 0
+        segments_ready = False
+
+        def drain(limit):
+            # Wait until at most `limit` uploads are pending, polling so a
+            # cancel request drops the queued ones promptly
+            nonlocal pending, success
+            while len(pending) > limit:
+                if cancel.is_set():
+                    for f in pending:
+                        f.cancel()
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                success += sum(f.result() for f in done if not f.cancelled())
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
 
-    _ensure_container(container, env, log)
+            def submit(path, size, name):
+                nonlocal segments_ready
+                if size > segment_threshold and not segments_ready:
+                    _ensure_container(f"{container}_segments", svc, env, locked_log)
+                    segments_ready = True
+                drain(2 * workers - 1)
+                pending.add(ex.submit(
+                    _upload_file, path, name, container, svc, locked_log, cancel, size,
+                    segment_threshold, segment_size, skip_unchanged,
+                ))
 
-    files = sorted(f for f in source_dir.rglob("*") if f.is_file())
-    if not files:
-        log("No files found in the selected directory.")
-        return 0, 0
+            def flush_small():
+                nonlocal small_bytes
+                if len(small) >= BUNDLE_MIN_FILES:
+                    drain(2 * workers - 1)
+                    pending.add(ex.submit(
+                        _upload_bundle, small[:], bulk, container, svc, locked_log, cancel,
+                        skip_unchanged,
+                    ))
+                else:
+                    for entry in small:
+                        submit(*entry)
+                small.clear()
+                small_bytes = 0
 
-    log(f"Uploading {len(files)} file(s) from '{source_dir.name}' → container '{container}'")
+            for path, size, name in _iter_files(str(source_dir)):
+                if cancel.is_set():
+                    break
+                total += 1
+                if not bulk or size >= SMALL_FILE_MAX:
+                    submit(path, size, name)
+                    continue
+                # _iter_files lists a directory's files together, so a change
+                # of folder (or a full bundle) closes the current group
+                if small and (
+                    small[0][2].rpartition("/")[0] != name.rpartition("/")[0]
+                    or small_bytes + size > BUNDLE_MAX_BYTES
+                ):
+                    flush_small()
+                small.append((path, size, name))
+                small_bytes += size
+            if not cancel.is_set():
+                flush_small()
+            drain(0)
 
-    success = 0
-    for f in files:
-        if _upload_file(f, source_dir, container, env, log):
-            success += 1
+        if cancel.is_set():
+            log("Upload cancelled.")
+        elif not total:
+            log("No files found in the selected directory.")
 
-    return success, len(files)
+    return success, total
@@ -3,76 +3,268 @@
 # SAFSuite — CSV Validator and PDF Reverter
 
 import csv
+import functools
 import os
+import multiprocessing
 import re
+import stat
 import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from collections import defaultdict
 import flet as ft
 from Deconstructed.reverter import invert_pdf
 from Deconstructed.safBuilder import build_saf
-from Deconstructed.stackimporter import upload_directory, check_auth
+from Deconstructed.stackimporter import (
+    SEGMENT_SIZE,
+    SEGMENT_THREADS,
+    SEGMENT_THRESHOLD,
+    check_auth,
+    upload_directory,
+)
+
+
+def _env_int(name, default):
+    """Positive integer from an environment variable, or default if unset/invalid."""
+    try:
+        return max(1, int(os.environ[name]))
+    except (KeyError, ValueError):
+        return default
+
+
+INVERT_WORKERS = 4  # PDF inversion processes; gains flatten out beyond this
+# Concurrent Swift PUTs; raise on high-latency links, lower on a shared uplink
+UPLOAD_CONCURRENCY = _env_int("SAF_UPLOAD_CONCURRENCY", 8)
+# Segmented uploads of large files: size cut-off, minimum segment size (bytes)
+# and segment PUTs in flight
+MULTIPART_THRESHOLD = _env_int("SAF_MULTIPART_THRESHOLD", SEGMENT_THRESHOLD)
+PART_SIZE = _env_int("SAF_PART_SIZE", SEGMENT_SIZE)
+PART_CONCURRENCY = _env_int("SAF_PART_CONCURRENCY", SEGMENT_THREADS)
+UPLOAD_LOG_LINES = 500  # uploader progress rows kept on screen
+_OPENRC_RE = re.compile(r'^\s*export\s+(\w+)=(.+)$')  # static `export VAR=VALUE` lines
+
+
+# ── UI helpers ────────────────────────────────────────────────────────────────
+
+class UIBatcher:
+    """
+    Buffer controls bound for a column and push them to the page in batches.
+
+    Each page.update() sends a diff over the Flet connection, so instead of
+    one per appended row the buffer is flushed at most every `interval`
+    seconds, or straight away once `max_items` rows are waiting. Call
+    flush() when done so the tail of the buffer is shown.
+
+    With `limit` set, only the newest `limit` rows are kept, so the control
+    tree (and every diff) stays bounded on long runs.
+    """
+
+    def __init__(self, page, controls, interval=0.1, max_items=50, limit=None):
+        self.page = page
+        self.controls = controls
+        self.interval = interval
+        self.max_items = max_items
+        self.limit = limit
+        self._buffer = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def append(self, control):
+        with self._lock:
+            self._buffer.append(control)
+            flush_now = len(self._buffer) >= self.max_items
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._buffer = self._buffer, []
+            self.controls.extend(pending)
+            if self.limit is not None and len(self.controls) > self.limit:
+                del self.controls[:len(self.controls) - self.limit]
+        if pending:
+            self.page.update()
+            # Give up the GIL so Flet's I/O thread can serve input events
+            # between bursts from a busy worker thread
+            time.sleep(0)
 
 
 # ── CSV validation logic ──────────────────────────────────────────────────────
 
-def find_csv_and_pdfs(base_dir):
-    """Find all directories with CSV files and PDFs at any level."""
-    results = []
-    base_path = Path(base_dir)
-    
-    # Check if the selected directory itself contains CSV files
-    direct_csvs = list(base_path.glob("*.csv"))
-    if direct_csvs:
-        pdf_files = set(f.name for f in base_path.glob("*.pdf"))
-        results.append({
-            'month_dir': base_path,
-            'csv_file': direct_csvs[0],
-            'pdf_files': pdf_files
-        })
-    
-    # Find all directories that contain CSV files
-    processed_dirs = {base_path} if direct_csvs else set()
-    
-    for csv_file in sorted(base_path.rglob("*.csv")):
-        csv_dir = csv_file.parent
-        
-        # Skip if we already processed this directory
-        if csv_dir in processed_dirs:
+# Tool and VCS directories never hold collection files; walks skip these
+# (and any other dot-directory) unless hidden directories are requested.
+_PRUNE = frozenset({
+    '.git', '.hg', '.svn', '__pycache__', 'node_modules',
+    '.venv', 'venv', '.tox', '.mypy_cache',
+})
+
+
+def _pruned(name, scan_hidden):
+    """True if a subdirectory called name should not be descended into."""
+    return not scan_hidden and (name in _PRUNE or name.startswith('.'))
+
+
+def _list_dir(dir_path):
+    """
+    Return (dir_names, file_names) for the entries directly in dir_path.
+
+    Types come from the cached DirEntry d_type. On mounts where a type check
+    itself fails (some SMB/NFS setups), that entry is classified from an
+    explicit lstat instead; if that fails too the OSError propagates and the
+    caller skips the directory rather than misfiling the entry.
+    """
+    dir_names = []
+    file_names = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                mode = os.lstat(entry.path).st_mode
+                is_dir = stat.S_ISDIR(mode)
+                # is_file() follows symlinks, so a link to a file still counts
+                is_file = stat.S_ISREG(mode) or (stat.S_ISLNK(mode) and os.path.isfile(entry.path))
+            if is_dir:
+                dir_names.append(entry.name)
+            elif is_file:
+                file_names.append(entry.name)
+    return dir_names, file_names
+
+
+def _walk_tree(root, scan_hidden=False):
+    """
+    Yield (dir_path, file_names) for root and every directory below it,
+    parents before children and siblings in name order. Noise directories
+    are pruned unless scan_hidden is set, and no Path objects are built.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            dir_names, file_names = _list_dir(dir_path)
+        except OSError:
             continue
-            
-        processed_dirs.add(csv_dir)
-        
-        # Get all CSV and PDF files in this directory
-        csv_files = list(csv_dir.glob("*.csv"))
-        if csv_files:
-            pdf_files = set(f.name for f in csv_dir.glob("*.pdf"))
-            results.append({
-                'month_dir': csv_dir,
-                'csv_file': csv_files[0],
-                'pdf_files': pdf_files
-            })
-    
-    return results
+        dir_names = [n for n in dir_names if not _pruned(n, scan_hidden)]
+        # Reverse-sorted onto the stack so directories come out in name order
+        dir_names.sort(reverse=True)
+        stack.extend(os.path.join(dir_path, n) for n in dir_names)
+        yield dir_path, file_names
+
+
+def _scan_dirs(root, scan_hidden=False):
+    """
+    Yield (dir_path, csv_names, pdf_names) for every directory under root
+    that directly contains at least one CSV, in _walk_tree order.
+    """
+    for dir_path, file_names in _walk_tree(root, scan_hidden):
+        csv_names = []
+        pdf_names = set()
+        # Bucket CSVs and PDFs in one pass: a single extension lookup per
+        # entry, with the bound add methods fetched once per directory
+        bucket_for = {'csv': csv_names.append, 'pdf': pdf_names.add}.get
+        for name in file_names:
+            # No dot means no extension: a file named "csv" is not a CSV
+            ext = name[name.rfind('.') + 1:].lower() if '.' in name else ''
+            bucket = bucket_for(ext)
+            if bucket is not None:
+                bucket(name)
+        if csv_names:
+            yield dir_path, csv_names, frozenset(pdf_names)
+
+
+def _iter_pdfs(root, recursive=True, scan_hidden=False):
+    """
+    Yield the path string of every PDF under root (or directly in it).
+
+    Symlinks are skipped, so a linked PDF can't be inverted twice or have its
+    link replaced; every other type check uses the cached DirEntry d_type.
+    Noise directories are pruned unless scan_hidden is set.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not _pruned(entry.name, scan_hidden):
+                            stack.append(entry.path)
+                    elif entry.name.lower().endswith('.pdf') and entry.is_file(follow_symlinks=False):
+                        yield entry.path
+        except OSError:
+            continue
+
+
+def _dir_label(base_name, rel_parts):
+    """Display name for a scanned directory, given its path parts relative to the base."""
+    if rel_parts == ['.']:
+        # Selected directory itself
+        return f"{base_name} (selected directory)"
+    if len(rel_parts) == 1:
+        return f"{base_name} / {rel_parts[0]}"
+    # Nested - show parent/current structure
+    return f"{rel_parts[-2]} / {rel_parts[-1]}"
+
+
+def find_csv_and_pdfs(base_dir, scan_hidden=False):
+    """
+    Find all directories with CSV files and PDFs at any level.
+
+    Yields one dict per directory as the walk reaches it, so callers can
+    show results while the rest of the tree is still being scanned.
+    """
+    base_name = Path(base_dir).name
+    for dir_path, csv_names, pdf_names in _scan_dirs(base_dir, scan_hidden):
+        month_dir = Path(dir_path)
+        rel_parts = os.path.relpath(dir_path, base_dir).split(os.sep)
+        yield {
+            'month_dir': month_dir,
+            'csv_file': month_dir / csv_names[0],
+            'pdf_files': pdf_names,
+            'label': _dir_label(base_name, rel_parts),
+        }
+
+
+# Past this many unlisted PDFs in one directory the report is left unsorted
+_SORT_UNLISTED_MAX = 1000
 
 
 def validate_csv_against_pdfs(csv_file, pdf_files, month_dir):
     """Validate CSV entries against actual PDF files."""
     errors = []
-    csv_filenames = []
+    csv_filenames = set()
 
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-
-            if 'filename' not in reader.fieldnames:
+        # 1 MiB buffer: fewer read() calls on large CSVs; newline='' as csv expects
+        with open(csv_file, 'r', encoding='utf-8', newline='', errors='replace',
+                  buffering=1 << 20) as f:
+            # Only the filename column is needed, so index into plain rows
+            # instead of building a dict per row with DictReader
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            try:
+                idx = header.index('filename')
+            except ValueError:
                 return [{
                     'type': 'CRITICAL',
-                    'message': f'No "filename" column found in CSV. Columns: {reader.fieldnames}'
+                    'message': f'No "filename" column found in CSV. Columns: {header}'
                 }]
 
-            for row_num, row in enumerate(reader, start=2):
-                filename = row.get('filename', '').strip()
+            rows = (row for row in reader if row)  # DictReader skipped blank lines too
+            has_pdf = pdf_files.__contains__
+            for row_num, row in enumerate(rows, start=2):
+                filename = row[idx].strip() if idx < len(row) else ''
 
                 if not filename:
                     errors.append({
@@ -82,9 +274,9 @@ def validate_csv_against_pdfs(csv_file, pdf_files, month_dir):
                     })
                     continue
 
-                csv_filenames.append(filename)
+                csv_filenames.add(filename)
 
-                if filename not in pdf_files:
+                if not has_pdf(filename):
                     errors.append({
                         'type': 'MISSING_PDF',
                         'row': row_num,
@@ -95,8 +287,11 @@ def validate_csv_against_pdfs(csv_file, pdf_files, month_dir):
     except Exception as e:
         return [{'type': 'ERROR', 'message': f'Error reading CSV: {str(e)}'}]
 
-    csv_set = set(csv_filenames)
-    for pdf in sorted(pdf_files - csv_set):
+    unlisted = pdf_files.difference(csv_filenames)
+    # Name order only helps when the list is short enough to read through
+    if len(unlisted) <= _SORT_UNLISTED_MAX:
+        unlisted = sorted(unlisted)
+    for pdf in unlisted:
         errors.append({
             'type': 'UNLISTED_PDF',
             'filename': pdf,
@@ -110,11 +305,13 @@ def validate_csv_against_pdfs(csv_file, pdf_files, month_dir):
 
 def build_validator_tab(page: ft.Page):
     selected_path = ft.Ref[ft.Text]()
-    results_col = ft.Ref[ft.Column]()
+    results_col = ft.Ref[ft.ListView]()
     summary_container = ft.Ref[ft.Container]()
     summary_text = ft.Ref[ft.Text]()
     validate_btn = ft.Ref[ft.ElevatedButton]()
 
+    hidden_switch = ft.Switch(label="Scan hidden dirs", value=False)
+
     def on_dir_selected(e: ft.FilePickerResultEvent):
         if e.path:
             selected_path.current.value = e.path
@@ -144,44 +341,22 @@ def build_validator_tab(page: ft.Page):
             page.update()
             return
 
-        month_data = find_csv_and_pdfs(base_dir)
-        if not month_data:
-            results_col.current.controls.append(
-                ft.Text("No CSV files found in selected directory or subdirectories.", color=ft.Colors.ORANGE)
-            )
-            validate_btn.current.disabled = False
-            page.update()
-            return
-
+        dir_count = 0
         total_errors = 0
         error_summary = defaultdict(int)
+        batcher = UIBatcher(page, results_col.current.controls)
 
-        for data in month_data:
+        # Validate each directory as the scan reaches it rather than after the whole walk
+        for data in find_csv_and_pdfs(base_dir, scan_hidden=hidden_switch.value):
+            dir_count += 1
             month_dir = data['month_dir']
             csv_file = data['csv_file']
             pdf_files = data['pdf_files']
 
             errors = validate_csv_against_pdfs(csv_file, pdf_files, month_dir)
 
-            # Create meaningful directory label based on relative path from base
-            try:
-                rel_path = month_dir.relative_to(base_path)
-                if rel_path == Path('.'):
-                    # Selected directory itself
-                    dir_label_text = f"{base_path.name} (selected directory)"
-                else:
-                    # Subdirectory - show parent/current structure
-                    path_parts = rel_path.parts
-                    if len(path_parts) == 1:
-                        dir_label_text = f"{base_path.name} / {path_parts[0]}"
-                    else:
-                        dir_label_text = f"{path_parts[-2]} / {path_parts[-1]}"
-            except ValueError:
-                # Fallback if path math fails
-                dir_label_text = f"{month_dir.parent.name} / {month_dir.name}"
-                
             dir_label = ft.Text(
-                dir_label_text,
+                data['label'],
                 weight=ft.FontWeight.BOLD,
                 size=14,
             )
@@ -220,7 +395,7 @@ def build_validator_tab(page: ft.Page):
                 )
                 border_color = ft.Colors.GREEN_900
 
-            results_col.current.controls.append(
+            batcher.append(
                 ft.Container(
                     content=ft.Column(
                         [dir_label, meta_row, ft.Divider(height=6, color=ft.Colors.GREY_800)] + error_controls,
@@ -233,16 +408,26 @@ def build_validator_tab(page: ft.Page):
                 )
             )
 
+        batcher.flush()
+
+        if not dir_count:
+            results_col.current.controls.append(
+                ft.Text("No CSV files found in selected directory or subdirectories.", color=ft.Colors.ORANGE)
+            )
+            validate_btn.current.disabled = False
+            page.update()
+            return
+
         if total_errors == 0:
             summary_color = ft.Colors.GREEN_400
             summary_bg = ft.Colors.GREEN_900
-            summary_msg = f"All {len(month_data)} directories validated successfully — no errors found."
+            summary_msg = f"All {dir_count} directories validated successfully — no errors found."
         else:
             summary_color = ft.Colors.ORANGE_400
             summary_bg = ft.Colors.ORANGE_900
             breakdown = "   |   ".join(f"{k}: {v}" for k, v in sorted(error_summary.items()))
             summary_msg = (
-                f"{len(month_data)} directories scanned   |   "
+                f"{dir_count} directories scanned   |   "
                 f"{total_errors} total errors   |   {breakdown}"
             )
 
@@ -257,7 +442,6 @@ def build_validator_tab(page: ft.Page):
         expand=True,
         padding=20,
         content=ft.Column(
-            scroll=ft.ScrollMode.AUTO,
             expand=True,
             controls=[
                 ft.Text("CSV Validator", size=22, weight=ft.FontWeight.BOLD),
@@ -285,12 +469,18 @@ def build_validator_tab(page: ft.Page):
                     spacing=12,
                     vertical_alignment=ft.CrossAxisAlignment.CENTER,
                 ),
-                ft.ElevatedButton(
-                    "Validate",
-                    ref=validate_btn,
-                    icon=ft.Icons.PLAY_ARROW,
-                    on_click=run_validation,
-                    disabled=True,
+                ft.Row(
+                    [
+                        ft.ElevatedButton(
+                            "Validate",
+                            ref=validate_btn,
+                            icon=ft.Icons.PLAY_ARROW,
+                            on_click=run_validation,
+                            disabled=True,
+                        ),
+                        hidden_switch,
+                    ],
+                    spacing=24,
                 ),
                 ft.Divider(height=16),
                 ft.Container(
@@ -300,7 +490,7 @@ def build_validator_tab(page: ft.Page):
                     border_radius=8,
                     visible=False,
                 ),
-                ft.Column(ref=results_col, spacing=0),
+                ft.ListView(ref=results_col, spacing=0, expand=True),
             ],
         ),
     )
@@ -313,12 +503,13 @@ def build_inverter_tab(page: ft.Page):
     pdf_count_text = ft.Ref[ft.Text]()
     overwrite_warning = ft.Ref[ft.Container]()
     invert_btn = ft.Ref[ft.ElevatedButton]()
-    progress_col = ft.Ref[ft.Column]()
+    progress_col = ft.Ref[ft.ListView]()
     summary_container = ft.Ref[ft.Container]()
     summary_text = ft.Ref[ft.Text]()
 
     recursive_switch = ft.Switch(label="Recursive", value=True)
     keep_original_switch = ft.Switch(label="Keep originals (create _inverted copies)", value=False)
+    hidden_switch = ft.Switch(label="Scan hidden dirs", value=False)
 
     current_dir = {"path": None, "pdf_files": []}
 
@@ -326,23 +517,35 @@ def build_inverter_tab(page: ft.Page):
         base = current_dir["path"]
         if not base:
             return
-        path = Path(base)
-        if recursive_switch.value:
-            pdfs = list(path.rglob("*.pdf"))
-        else:
-            pdfs = list(path.glob("*.pdf"))
-        current_dir["pdf_files"] = pdfs
-        count = len(pdfs)
-        if count == 0:
-            pdf_count_text.current.value = "No PDF files found in selected directory."
-            pdf_count_text.current.color = ft.Colors.ORANGE_400
-            invert_btn.current.disabled = True
-        else:
-            pdf_count_text.current.value = f"{count} PDF file{'s' if count != 1 else ''} found."
-            pdf_count_text.current.color = ft.Colors.BLUE_200
-            invert_btn.current.disabled = False
+        recursive = recursive_switch.value
+        scan_hidden = hidden_switch.value
+        current_dir["pdf_files"] = []
+        pdf_count_text.current.value = "Scanning…"
+        pdf_count_text.current.color = ft.Colors.GREY_400
+        invert_btn.current.disabled = True
         page.update()
 
+        # Scan in the background so a large tree doesn't freeze the UI
+        def scan():
+            # Plain strings: a Path is only built when a file is actually inverted
+            pdfs = list(_iter_pdfs(base, recursive=recursive, scan_hidden=scan_hidden))
+            if (current_dir["path"] != base or recursive_switch.value != recursive
+                    or hidden_switch.value != scan_hidden):
+                return  # superseded by a newer selection
+            current_dir["pdf_files"] = pdfs
+            count = len(pdfs)
+            if count == 0:
+                pdf_count_text.current.value = "No PDF files found in selected directory."
+                pdf_count_text.current.color = ft.Colors.ORANGE_400
+                invert_btn.current.disabled = True
+            else:
+                pdf_count_text.current.value = f"{count} PDF file{'s' if count != 1 else ''} found."
+                pdf_count_text.current.color = ft.Colors.BLUE_200
+                invert_btn.current.disabled = False
+            page.update()
+
+        threading.Thread(target=scan, daemon=True).start()
+
     def on_dir_selected(e: ft.FilePickerResultEvent):
         if e.path:
             current_dir["path"] = e.path
@@ -361,6 +564,7 @@ def build_inverter_tab(page: ft.Page):
         page.update()
 
     recursive_switch.on_change = on_recursive_change
+    hidden_switch.on_change = on_recursive_change
     keep_original_switch.on_change = on_keep_original_change
 
     def run_inversion(e):
@@ -377,44 +581,60 @@ def build_inverter_tab(page: ft.Page):
 
         def worker():
             success_count = 0
-            for pdf_path in pdf_files:
-                ok, msg = invert_pdf(pdf_path, overwrite=overwrite)
-                color = ft.Colors.GREEN_400 if ok else ft.Colors.RED_400
-                icon = ft.Icons.CHECK_CIRCLE if ok else ft.Icons.CANCEL
-                if ok:
-                    success_count += 1
-                progress_col.current.controls.append(
-                    ft.Row([
-                        ft.Icon(icon, color=color, size=14),
-                        ft.Text(msg, color=color, size=12),
-                    ], spacing=6)
-                )
+            batcher = UIBatcher(page, progress_col.current.controls)
+            # Rasterizing is CPU-bound, so invert files in separate processes;
+            # results are consumed here, so only this thread touches the UI
+            max_workers = min(os.cpu_count() or 1, INVERT_WORKERS, len(pdf_files))
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+                ) as ex:
+                    future_to_path = {
+                        ex.submit(invert_pdf, Path(pdf_path), None, overwrite): Path(pdf_path)
+                        for pdf_path in pdf_files
+                    }
+                    for future in as_completed(future_to_path):
+                        try:
+                            ok, msg = future.result()
+                        except Exception as err:
+                            # The worker process itself failed (e.g. it crashed)
+                            ok, msg = False, f"Error processing {future_to_path[future].name}: {err}"
+                        color = ft.Colors.GREEN_400 if ok else ft.Colors.RED_400
+                        icon = ft.Icons.CHECK_CIRCLE if ok else ft.Icons.CANCEL
+                        if ok:
+                            success_count += 1
+                        batcher.append(
+                            ft.Row([
+                                ft.Icon(icon, color=color, size=14),
+                                ft.Text(msg, color=color, size=12),
+                            ], spacing=6)
+                        )
+            finally:
+                batcher.flush()
+
+                total = len(pdf_files)
+                if success_count == total:
+                    s_color = ft.Colors.GREEN_400
+                    s_bg = ft.Colors.GREEN_900
+                    s_msg = f"Done — {success_count}/{total} files inverted successfully."
+                else:
+                    s_color = ft.Colors.ORANGE_400
+                    s_bg = ft.Colors.ORANGE_900
+                    s_msg = f"Finished with errors — {success_count}/{total} files succeeded."
+
+                summary_text.current.value = s_msg
+                summary_text.current.color = s_color
+                summary_container.current.bgcolor = s_bg
+                summary_container.current.visible = True
+                invert_btn.current.disabled = False
                 page.update()
 
-            total = len(pdf_files)
-            if success_count == total:
-                s_color = ft.Colors.GREEN_400
-                s_bg = ft.Colors.GREEN_900
-                s_msg = f"Done — {success_count}/{total} files inverted successfully."
-            else:
-                s_color = ft.Colors.ORANGE_400
-                s_bg = ft.Colors.ORANGE_900
-                s_msg = f"Finished with errors — {success_count}/{total} files succeeded."
-
-            summary_text.current.value = s_msg
-            summary_text.current.color = s_color
-            summary_container.current.bgcolor = s_bg
-            summary_container.current.visible = True
-            invert_btn.current.disabled = False
-            page.update()
-
         threading.Thread(target=worker, daemon=True).start()
 
     return ft.Container(
         expand=True,
         padding=20,
         content=ft.Column(
-            scroll=ft.ScrollMode.AUTO,
             expand=True,
             controls=[
                 ft.Text("PDF Reverter", size=22, weight=ft.FontWeight.BOLD),
@@ -442,7 +662,7 @@ def build_inverter_tab(page: ft.Page):
                     spacing=12,
                     vertical_alignment=ft.CrossAxisAlignment.CENTER,
                 ),
-                ft.Row([recursive_switch, keep_original_switch], spacing=24),
+                ft.Row([recursive_switch, keep_original_switch, hidden_switch], spacing=24),
                 ft.Text("", ref=pdf_count_text, size=13),
                 ft.Container(
                     ref=overwrite_warning,
@@ -474,7 +694,7 @@ def build_inverter_tab(page: ft.Page):
                     border_radius=8,
                     visible=False,
                 ),
-                ft.Column(ref=progress_col, spacing=2),
+                ft.ListView(ref=progress_col, spacing=2, expand=True, auto_scroll=True),
             ],
         ),
     )
@@ -482,17 +702,43 @@ def build_inverter_tab(page: ft.Page):
 
 # ── SAF Builder tab ───────────────────────────────────────────────────────────
 
+def _build_saf_jobs(jobs, workers):
+    """
+    Build SAF packages for (csv_path, output_dir) jobs in order, in a worker process.
+    workers caps build_saf's item threads, so the process pool bounds total I/O.
+
+    Returns an (ok, lines) pair per job; lines are (message, is_error) tuples
+    captured from build_saf, since the Flet log callback can't be pickled.
+    """
+    results = []
+    for csv_path, output_dir in jobs:
+        lines = []
+        try:
+            build_saf(csv_path, output_dir, log=lambda msg: lines.append((msg, False)),
+                      workers=workers)
+            ok = True
+        except ValueError as err:
+            lines.extend((line, True) for line in str(err).splitlines())
+            ok = False
+        except Exception as err:
+            lines.append((f"Unexpected error: {err}", True))
+            ok = False
+        results.append((ok, lines))
+    return results
+
+
 def build_saf_tab(page: ft.Page):
     source_path = ft.Ref[ft.Text]()
     output_path = ft.Ref[ft.Text]()
     csv_count_text = ft.Ref[ft.Text]()
     build_btn = ft.Ref[ft.ElevatedButton]()
-    progress_col = ft.Ref[ft.Column]()
+    progress_col = ft.Ref[ft.ListView]()
 
 
 
     state = {"source": None, "output": None, "csv_entries": []}
     output_preview = ft.Ref[ft.Text]()
+    hidden_switch = ft.Switch(label="Scan hidden dirs", value=False)
 
     def refresh_output_preview():
         if state["source"] and state["output"]:
@@ -507,71 +753,74 @@ def build_saf_tab(page: ft.Page):
         has_csvs = len(state["csv_entries"]) > 0
         build_btn.current.disabled = not (state["source"] and state["output"] and has_csvs)
 
-    def scan_csvs(base_dir):
-        """Return list of (csv_path, parent_name, dir_name) for each directory with a CSV."""
+    def scan_csvs(base_dir, scan_hidden=False):
+        """
+        Return list of (csv_path, parent_name, dir_name, header) for each directory
+        with a CSV; header is the log heading shown when the package is built.
+        """
         entries = []
         base_path = Path(base_dir)
         
-        # Check if the selected directory itself contains CSV files
-        direct_csvs = list(base_path.glob("*.csv"))
-        if direct_csvs:
-            entries.append((direct_csvs[0], base_path.parent.name, base_path.name))
-        
-        # Recursively search for CSV files in subdirectories
-        for csv_file in sorted(base_path.rglob("*.csv")):
-            csv_dir = csv_file.parent
-            # Skip if we already found this directory
-            if any(entry[0].parent == csv_dir for entry in entries):
-                continue
-            
+        for dir_path, csv_names, _ in _scan_dirs(base_path, scan_hidden):
             # Create meaningful parent/directory names based on relative path from base
-            try:
-                rel_path = csv_dir.relative_to(base_path)
-                path_parts = rel_path.parts
+            path_parts = os.path.relpath(dir_path, base_path).split(os.sep)
+            if path_parts == ['.']:
+                # The selected directory itself
+                parent_name = base_path.parent.name
+                dir_name = base_path.name
+            elif len(path_parts) == 1:
+                # Direct subdirectory: base_name / dir_name
+                parent_name = base_path.name
+                dir_name = path_parts[0]
+            else:
+                # Nested: parent_dir / current_dir
+                parent_name = path_parts[-2]
+                dir_name = path_parts[-1]
                 
-                if len(path_parts) == 1:
-                    # Direct subdirectory: base_name / dir_name
-                    parent_name = base_path.name
-                    dir_name = path_parts[0]
-                elif len(path_parts) >= 2:
-                    # Nested: parent_dir / current_dir
-                    parent_name = path_parts[-2]
-                    dir_name = path_parts[-1]
-                else:
-                    # Shouldn't happen, but fallback
-                    parent_name = "unknown"
-                    dir_name = csv_dir.name
-                    
-                entries.append((csv_file, parent_name, dir_name))
-                    
-            except ValueError:
-                # csv_file is not relative to base_path (shouldn't happen with rglob)
-                continue
+            header = f"{parent_name} / {dir_name}  —  {csv_names[0]}"
+            entries.append((Path(dir_path, csv_names[0]), parent_name, dir_name, header))
                 
         return entries
 
     def on_source_selected(e: ft.FilePickerResultEvent):
-        if not e.path:
+        if e.path:
+            state["source"] = e.path
+            rescan()
+
+    def rescan():
+        path = state["source"]
+        if not path:
             return
-        state["source"] = e.path
-        source_path.current.value = e.path
+        scan_hidden = hidden_switch.value
+        state["csv_entries"] = []
+        source_path.current.value = path
         source_path.current.color = ft.Colors.WHITE
-
-        entries = scan_csvs(e.path)
-        state["csv_entries"] = entries
-        count = len(entries)
-        if count == 0:
-            csv_count_text.current.value = "No CSVs found in selected directory or subdirectories."
-            csv_count_text.current.color = ft.Colors.ORANGE_400
-        else:
-            dirs = "directory" if count == 1 else "directories"
-            csv_count_text.current.value = f"{count} CSV file{'s' if count != 1 else ''} found across {count} {dirs}."
-            csv_count_text.current.color = ft.Colors.BLUE_200
-
+        csv_count_text.current.value = "Scanning…"
+        csv_count_text.current.color = ft.Colors.GREY_400
         refresh_output_preview()
         refresh_build_btn()
         page.update()
 
+        # Scan in the background so a large tree doesn't freeze the UI
+        def scan():
+            entries = scan_csvs(path, scan_hidden)
+            if state["source"] != path or hidden_switch.value != scan_hidden:
+                return  # superseded by a newer selection
+            state["csv_entries"] = entries
+            count = len(entries)
+            if count == 0:
+                csv_count_text.current.value = "No CSVs found in selected directory or subdirectories."
+                csv_count_text.current.color = ft.Colors.ORANGE_400
+            else:
+                dirs = "directory" if count == 1 else "directories"
+                csv_count_text.current.value = f"{count} CSV file{'s' if count != 1 else ''} found across {count} {dirs}."
+                csv_count_text.current.color = ft.Colors.BLUE_200
+
+            refresh_build_btn()
+            page.update()
+
+        threading.Thread(target=scan, daemon=True).start()
+
     def on_output_selected(e: ft.FilePickerResultEvent):
         if not e.path:
             return
@@ -582,6 +831,8 @@ def build_saf_tab(page: ft.Page):
         refresh_build_btn()
         page.update()
 
+    hidden_switch.on_change = lambda _: rescan()
+
     source_picker = ft.FilePicker(on_result=on_source_selected)
     output_picker = ft.FilePicker(on_result=on_output_selected)
     page.overlay.extend([source_picker, output_picker])
@@ -598,11 +849,12 @@ def build_saf_tab(page: ft.Page):
         output_base = Path(state["output"]) / f"{Path(state['source']).name}_SAF_Output"
         output_name = "SimpleArchiveFormat"
 
+        batcher = UIBatcher(page, progress_col.current.controls)
+
         def log_line(msg, color=ft.Colors.GREY_300):
-            progress_col.current.controls.append(
+            batcher.append(
                 ft.Text(msg, size=12, color=color, font_family="monospace")
             )
-            page.update()
 
         def worker():
             # Insert summary placeholder at position 0 so it stays at the top of the log
@@ -619,26 +871,52 @@ def build_saf_tab(page: ft.Page):
             progress_col.current.controls.insert(0, summary_box)
             page.update()
 
-            success_count = 0
-            for csv_path, parent_name, dir_name in entries:
-                output_dir = output_base / parent_name / dir_name / output_name
-                header = f"{parent_name} / {dir_name}  —  {csv_path.name}"
-                progress_col.current.controls.append(
-                    ft.Container(
-                        content=ft.Text(header, size=13, weight=ft.FontWeight.BOLD),
-                        margin=ft.margin.only(top=10, bottom=2),
-                    )
-                )
-                page.update()
+            # Each package is independent, so build them in separate processes.
+            # Entries that map to the same output directory share one job so
+            # they still run in order instead of racing on the same files.
+            groups = defaultdict(list)
+            for entry in entries:
+                _, parent_name, dir_name, _ = entry
+                groups[output_base / parent_name / dir_name / output_name].append(entry)
 
-                try:
-                    build_saf(csv_path, output_dir, log=lambda msg: log_line(msg))
-                    success_count += 1
-                except ValueError as err:
-                    for line in str(err).splitlines():
-                        log_line(line, color=ft.Colors.RED_400)
-                except Exception as err:
-                    log_line(f"Unexpected error: {err}", color=ft.Colors.RED_400)
+            success_count = 0
+            max_workers = min(os.cpu_count() or 1, len(groups))
+            # Split the CPUs between packages rather than letting each process
+            # start its own full-size item pool against the same disk
+            item_workers = max(1, (os.cpu_count() or 1) // len(groups))
+            with ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as ex:
+                future_to_group = {
+                    ex.submit(
+                        _build_saf_jobs, [(entry[0], output_dir) for entry in group], item_workers
+                    ): group
+                    for output_dir, group in groups.items()
+                }
+                for future in as_completed(future_to_group):
+                    group = future_to_group[future]
+                    try:
+                        results = future.result()
+                    except Exception as err:
+                        # The worker process itself failed (e.g. it was killed)
+                        results = [(False, [(f"Unexpected error: {err}", True)])] * len(group)
+
+                    for (_, _, _, header), (ok, lines) in zip(group, results):
+                        batcher.append(
+                            ft.Container(
+                                content=ft.Text(header, size=13, weight=ft.FontWeight.BOLD),
+                                margin=ft.margin.only(top=10, bottom=2),
+                            )
+                        )
+
+                        for msg, is_error in lines:
+                            if is_error:
+                                log_line(msg, color=ft.Colors.RED_400)
+                            else:
+                                log_line(msg)
+                        if ok:
+                            success_count += 1
+            batcher.flush()
 
             total = len(entries)
             if success_count == total:
@@ -662,7 +940,6 @@ def build_saf_tab(page: ft.Page):
         expand=True,
         padding=20,
         content=ft.Column(
-            scroll=ft.ScrollMode.AUTO,
             expand=True,
             controls=[
                 ft.Text("SAF Builder", size=22, weight=ft.FontWeight.BOLD),
@@ -691,6 +968,7 @@ def build_saf_tab(page: ft.Page):
                     spacing=12,
                     vertical_alignment=ft.CrossAxisAlignment.CENTER,
                 ),
+                hidden_switch,
                 ft.Text("", ref=csv_count_text, size=13),
                 ft.Divider(height=4),
                 ft.Text("Output directory", size=12, color=ft.Colors.GREY_500),
@@ -722,7 +1000,7 @@ def build_saf_tab(page: ft.Page):
                     disabled=True,
                 ),
                 ft.Divider(height=16),
-                ft.Column(ref=progress_col, spacing=0),
+                ft.ListView(ref=progress_col, spacing=0, expand=True, auto_scroll=True),
             ],
         ),
     )
@@ -731,21 +1009,28 @@ def build_saf_tab(page: ft.Page):
 # ── OpenStack Uploader tab ────────────────────────────────────────────────────
 
 
+@functools.lru_cache(maxsize=32)
+def _parse_openrc_cached(sh_path: str, mtime_ns: int) -> dict:
+    """Parse an openrc file; mtime_ns is only part of the cache key."""
+    result = {}
+    with open(sh_path) as f:
+        for line in f:
+            m = _OPENRC_RE.match(line.rstrip('\n'))
+            if m:
+                key = m.group(1)
+                val = m.group(2).strip().strip('"').strip("'")
+                if key != "OS_PASSWORD":
+                    result[key] = val
+    return result
+
+
 def _parse_openrc(sh_path: str) -> dict:
     """Extract static export VAR=VALUE entries from an openrc shell script."""
-    result = {}
+    # Re-picking an unchanged file is served from the cache; failed reads aren't cached
     try:
-        with open(sh_path) as f:
-            for line in f:
-                m = re.match(r'^\s*export\s+(\w+)=(.+)$', line.strip())
-                if m:
-                    key = m.group(1)
-                    val = m.group(2).strip().strip('"').strip("'")
-                    if key != "OS_PASSWORD":
-                        result[key] = val
+        return dict(_parse_openrc_cached(sh_path, os.stat(sh_path).st_mtime_ns))
     except OSError:
-        pass
-    return result
+        return {}
 
 
 def build_uploader_tab(page: ft.Page):
@@ -754,7 +1039,9 @@ def build_uploader_tab(page: ft.Page):
     cred_status      = ft.Ref[ft.Text]()
     source_cred_btn  = ft.Ref[ft.ElevatedButton]()
     upload_btn       = ft.Ref[ft.ElevatedButton]()
+    cancel_btn       = ft.Ref[ft.ElevatedButton]()
     progress_col     = ft.Ref[ft.Column]()
+    summary_col      = ft.Ref[ft.Column]()
     auth_log_col     = ft.Ref[ft.Column]()
 
     container_field = ft.TextField(
@@ -763,12 +1050,15 @@ def build_uploader_tab(page: ft.Page):
         width=280,
         text_size=13,
     )
+    skip_unchanged_switch = ft.Switch(label="Skip unchanged files", value=True)
 
     state = {
         "source":       None,
         "env":          None,   # merged env dict once credentials are loaded
         "rc_path":      None,
         "static_vars":  {},
+        "base_env":     {},     # os.environ + rc file vars, built once per rc file
+        "cancel_evt":   threading.Event(),  # set to stop the running upload
     }
 
     # ── openrc file picker ────────────────────────────────────────────────────
@@ -779,6 +1069,7 @@ def build_uploader_tab(page: ft.Page):
         path = e.files[0].path
         state["rc_path"] = path
         state["static_vars"] = _parse_openrc(path)
+        state["base_env"] = {**os.environ, **state["static_vars"]}
         openrc_path_text.current.value = path
         openrc_path_text.current.color = ft.Colors.WHITE
         # Pre-fill username from the rc file
@@ -816,8 +1107,8 @@ def build_uploader_tab(page: ft.Page):
         if not username or not password:
             return
 
-        # Merge: system env + rc file static vars + username/password from dialog
-        env = {**os.environ, **state["static_vars"]}
+        # Merged system env + rc file static vars, plus username/password from dialog
+        env = state["base_env"].copy()
         env["OS_USERNAME"] = username
         env["OS_PASSWORD"] = password
 
@@ -826,12 +1117,12 @@ def build_uploader_tab(page: ft.Page):
         # Verify auth in background — updates status label when done
         def verify():
             auth_log_col.current.controls.clear()
+            auth_batcher = UIBatcher(page, auth_log_col.current.controls, interval=0.05)
 
             def log_auth(msg):
-                auth_log_col.current.controls.append(
+                auth_batcher.append(
                     ft.Text(msg, size=12, color=ft.Colors.GREY_400, font_family="monospace")
                 )
-                page.update()
 
             cred_status.current.value = "Verifying credentials…"
             cred_status.current.color = ft.Colors.GREY_400
@@ -840,6 +1131,7 @@ def build_uploader_tab(page: ft.Page):
             log_auth(f"Loaded {len(state['static_vars'])} vars from {state['rc_path']}")
 
             ok, msg = check_auth(env, log=log_auth)
+            auth_batcher.flush()
             if ok:
                 state["env"] = env
                 project = env.get("OS_PROJECT_NAME", "")
@@ -903,15 +1195,21 @@ def build_uploader_tab(page: ft.Page):
             return
 
         container = container_field.value.strip() or "saf-transfer"
+        summary_col.current.controls.clear()
         progress_col.current.controls.clear()
         upload_btn.current.disabled = True
+        cancel_btn.current.disabled = False
+        cancel_evt = state["cancel_evt"] = threading.Event()
         page.update()
 
+        # One page.update() per ~50 ms of progress rather than one per file,
+        # and only the latest UPLOAD_LOG_LINES rows kept on screen
+        batcher = UIBatcher(
+            page, progress_col.current.controls, interval=0.05, limit=UPLOAD_LOG_LINES
+        )
+
         def log_line(msg, color=ft.Colors.GREY_300):
-            progress_col.current.controls.append(
-                ft.Text(msg, size=12, color=color, font_family="monospace")
-            )
-            page.update()
+            batcher.append(ft.Text(msg, size=12, color=color, font_family="monospace"))
 
         def worker():
             summary_label = ft.Text(
@@ -924,7 +1222,7 @@ def build_uploader_tab(page: ft.Page):
                 bgcolor=ft.Colors.GREY_900,
                 margin=ft.margin.only(bottom=8),
             )
-            progress_col.current.controls.insert(0, summary_box)
+            summary_col.current.controls.append(summary_box)
             page.update()
 
             try:
@@ -933,8 +1231,18 @@ def build_uploader_tab(page: ft.Page):
                     container=container,
                     env=state["env"],
                     log=log_line,
+                    max_parallel=UPLOAD_CONCURRENCY,
+                    segment_threshold=MULTIPART_THRESHOLD,
+                    segment_size=PART_SIZE,
+                    segment_threads=PART_CONCURRENCY,
+                    cancel=cancel_evt,
+                    skip_unchanged=skip_unchanged_switch.value,
                 )
-                if total == 0:
+                if cancel_evt.is_set():
+                    s_msg   = f"Cancelled — {success}/{total} files uploaded before stopping."
+                    s_color = ft.Colors.ORANGE_400
+                    s_bg    = ft.Colors.ORANGE_900
+                elif total == 0:
                     s_msg   = "No files found in the selected directory."
                     s_color = ft.Colors.ORANGE_400
                     s_bg    = ft.Colors.ORANGE_900
@@ -951,14 +1259,23 @@ def build_uploader_tab(page: ft.Page):
                 s_color = ft.Colors.RED_400
                 s_bg    = ft.Colors.RED_900
 
+            batcher.flush()
             summary_label.value  = s_msg
             summary_label.color  = s_color
             summary_box.bgcolor  = s_bg
             upload_btn.current.disabled = False
+            cancel_btn.current.disabled = True
             page.update()
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def cancel_upload(e):
+        # Queued files are dropped; the worker re-enables Upload once the
+        # transfers already in flight have drained
+        state["cancel_evt"].set()
+        cancel_btn.current.disabled = True
+        page.update()
+
     # ── layout ────────────────────────────────────────────────────────────────
 
     return ft.Container(
@@ -1045,15 +1362,32 @@ def build_uploader_tab(page: ft.Page):
                 ft.Divider(height=4),
 
                 # ── container + upload ────────────────────────────────────────
-                container_field,
-                ft.ElevatedButton(
-                    "Upload",
-                    ref=upload_btn,
-                    icon=ft.Icons.CLOUD_UPLOAD,
-                    on_click=run_upload,
-                    disabled=True,
+                ft.Row(
+                    [container_field, skip_unchanged_switch],
+                    spacing=24,
+                    vertical_alignment=ft.CrossAxisAlignment.CENTER,
+                ),
+                ft.Row(
+                    [
+                        ft.ElevatedButton(
+                            "Upload",
+                            ref=upload_btn,
+                            icon=ft.Icons.CLOUD_UPLOAD,
+                            on_click=run_upload,
+                            disabled=True,
+                        ),
+                        ft.ElevatedButton(
+                            "Cancel",
+                            ref=cancel_btn,
+                            icon=ft.Icons.CANCEL,
+                            on_click=cancel_upload,
+                            disabled=True,
+                        ),
+                    ],
+                    spacing=12,
                 ),
                 ft.Divider(height=16),
+                ft.Column(ref=summary_col, spacing=0),
                 ft.Column(ref=progress_col, spacing=0),
             ],
         ),